@@ -0,0 +1,500 @@
+"""
+离线 .blend 纹理扫描器，不需要启动 Blender。
+
+直接解析 .blend 文件格式（文件头、文件块、SDNA、IM 图像块、打包文件数据），
+列出每个文件引用的图像，并可以提取打包的图像。提取时不做格式转换，文件名为
+<图像名> 加打包数据实际格式的扩展名；插件导出时的文件名见结果中的 export_name。
+每个 .blend 的图像提取到以其相对扫描根目录的路径（去掉扩展名）命名的子目录，
+子目录重名时附加文件路径的哈希。
+
+用法：
+    python blend_scanner.py 路径1 [路径2 ...]            # 扫描 .blend 文件或目录，输出 JSON Lines
+    python blend_scanner.py 库目录 --extract 输出目录     # 同时提取打包的图像
+    python blend_scanner.py 库目录 --jobs 16             # 指定进程数
+
+未压缩文件使用内存映射读取；gzip 压缩的文件用标准库解压，
+zstd 压缩的文件（Blender 3.0+）需要安装 zstandard。
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# 图像来源（DNA_image_types.h 中的 IMA_SRC_*）
+IMAGE_SOURCES = {
+    1: "FILE",
+    2: "SEQUENCE",
+    3: "MOVIE",
+    4: "GENERATED",
+    5: "VIEWER",
+    6: "TILED",
+}
+
+# 打包数据的文件头 -> 扩展名
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x76\x2f\x31\x01", ".exr"),
+    (b"#?RADIANCE", ".hdr"),
+    (b"#?RGBE", ".hdr"),
+    (b"BM", ".bmp"),
+    (b"II*\x00", ".tif"),
+    (b"MM\x00*", ".tif"),
+    (b"RIFF", ".webp"),
+    (b"DDS ", ".dds"),
+    (b"8BPS", ".psd"),
+)
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+_FIELD_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_ARRAY_DIM = re.compile(r"\[(\d+)\]")
+
+
+class BlendFormatError(Exception):
+    """不是有效的 .blend 文件或结构无法识别"""
+
+
+class _Field:
+    __slots__ = ("offset", "type", "size", "is_pointer", "count")
+
+    def __init__(self, offset, type_name, size, is_pointer, count):
+        self.offset = offset
+        self.type = type_name
+        self.size = size
+        self.is_pointer = is_pointer
+        self.count = count
+
+
+class SDNA:
+    """DNA1 块中的结构描述，提供结构体字段的偏移"""
+
+    def __init__(self, data, offset, endian, pointer_size):
+        self.pointer_size = pointer_size
+
+        def read_int(pos):
+            return struct.unpack_from(endian + "i", data, pos)[0], pos + 4
+
+        def expect(pos, tag):
+            pos = (pos + 3) & ~3
+            if bytes(data[pos:pos + 4]) != tag:
+                raise BlendFormatError(f"SDNA 缺少 {tag!r} 段")
+            return pos + 4
+
+        def read_strings(pos, count):
+            strings = []
+            for _ in range(count):
+                end = data.find(b"\0", pos)
+                strings.append(bytes(data[pos:end]).decode("ascii", "replace"))
+                pos = end + 1
+            return strings, pos
+
+        pos = expect(offset, b"SDNA")
+        pos = expect(pos, b"NAME")
+        count, pos = read_int(pos)
+        names, pos = read_strings(pos, count)
+
+        pos = expect(pos, b"TYPE")
+        count, pos = read_int(pos)
+        types, pos = read_strings(pos, count)
+
+        pos = expect(pos, b"TLEN")
+        lengths = struct.unpack_from(f"{endian}{count}h", data, pos)
+        pos += 2 * count
+
+        pos = expect(pos, b"STRC")
+        count, pos = read_int(pos)
+
+        self.structs = {}
+        for _ in range(count):
+            type_index, field_count = struct.unpack_from(endian + "2h", data, pos)
+            pos += 4
+            raw_fields = struct.unpack_from(f"{endian}{2 * field_count}h", data, pos)
+            pos += 4 * field_count
+
+            fields = {}
+            field_offset = 0
+            for field_type, field_name in zip(raw_fields[0::2], raw_fields[1::2]):
+                name = names[field_name]
+                is_pointer = name.startswith("*") or name.startswith("(*")
+                count_in_array = 1
+                for dim in _ARRAY_DIM.findall(name):
+                    count_in_array *= int(dim)
+                element_size = pointer_size if is_pointer else lengths[field_type]
+                identifier = _FIELD_NAME.search(name).group(0)
+                fields[identifier] = _Field(
+                    field_offset, types[field_type], element_size * count_in_array,
+                    is_pointer, count_in_array,
+                )
+                field_offset += element_size * count_in_array
+
+            self.structs[types[type_index]] = fields
+
+
+class BlendFile:
+    """只读的 .blend 文件，按旧指针索引文件块"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._mmap = None
+
+        with open(path, "rb") as f:
+            magic = f.read(4)
+            f.seek(0)
+            if magic.startswith(_GZIP_MAGIC):
+                data = gzip.GzipFile(fileobj=f).read()
+            elif magic == _ZSTD_MAGIC:
+                data = _decompress_zstd(f)
+            else:
+                data = None
+
+        if data is None:
+            self._file = open(path, "rb")
+            try:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # 空文件无法映射
+                self.close()
+                raise BlendFormatError("空文件")
+            data = self._mmap
+        self.data = data
+
+        try:
+            self._parse()
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        self.data = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _parse(self):
+        data = self.data
+        if bytes(data[:7]) != b"BLENDER":
+            raise BlendFormatError("缺少 BLENDER 文件头")
+
+        if data[7:8] in (b"_", b"-"):
+            # 旧文件头：BLENDER + 指针大小 + 字节序 + 3 位版本号
+            self.pointer_size = 4 if data[7:8] == b"_" else 8
+            endian_code = data[8:9]
+            self.version = int(bytes(data[9:12]))
+            header_size = 12
+            large_bhead = False
+        else:
+            # Blender 5.0+ 文件头：BLENDER + 头长度 + '-' + 格式版本 + 字节序 + 4 位版本号
+            header_size = int(bytes(data[7:9]))
+            format_version = int(bytes(data[10:12]))
+            endian_code = data[12:13]
+            self.version = int(bytes(data[13:17]))
+            self.pointer_size = 8
+            large_bhead = format_version >= 1
+        if endian_code not in (b"v", b"V"):
+            raise BlendFormatError("无法识别的字节序")
+        self.endian = "<" if endian_code == b"v" else ">"
+
+        if large_bhead:
+            bhead = struct.Struct(self.endian + "4siQqq")
+        elif self.pointer_size == 8:
+            bhead = struct.Struct(self.endian + "4siQii")
+        else:
+            bhead = struct.Struct(self.endian + "4siIii")
+
+        # (code, 数据偏移, 长度, SDNA 编号, 个数)
+        self.blocks = []
+        self.pointers = {}
+        dna_offset = None
+        pos = header_size
+        size = len(data)
+        while pos + bhead.size <= size:
+            if large_bhead:
+                code, sdna_index, old, length, count = bhead.unpack_from(data, pos)
+            else:
+                code, length, old, sdna_index, count = bhead.unpack_from(data, pos)
+            pos += bhead.size
+            if code == b"ENDB":
+                break
+            block = (code, pos, length, sdna_index, count)
+            self.blocks.append(block)
+            if old:
+                self.pointers[old] = block
+            if code == b"DNA1":
+                dna_offset = pos
+            pos += length
+
+        if dna_offset is None:
+            raise BlendFormatError("缺少 DNA1 块")
+        self.sdna = SDNA(data, dna_offset, self.endian, self.pointer_size)
+
+    # -- 字段读取 -----------------------------------------------------------
+
+    def field(self, struct_name, field_name):
+        return self.sdna.structs.get(struct_name, {}).get(field_name)
+
+    def read_pointer(self, offset, field):
+        code = "I" if self.pointer_size == 4 else "Q"
+        return struct.unpack_from(self.endian + code, self.data, offset + field.offset)[0]
+
+    def read_int(self, offset, field):
+        code = {1: "b", 2: "h", 4: "i", 8: "q"}[field.size]
+        return struct.unpack_from(self.endian + code, self.data, offset + field.offset)[0]
+
+    def read_string(self, offset, field):
+        start = offset + field.offset
+        raw = bytes(self.data[start:start + field.size])
+        return raw.split(b"\0", 1)[0].decode("utf-8", "replace")
+
+    def block_data(self, block, length=None):
+        _, offset, block_length, _, _ = block
+        return bytes(self.data[offset:offset + (block_length if length is None else length)])
+
+
+def _decompress_zstd(f):
+    try:
+        import zstandard
+    except ImportError:
+        raise BlendFormatError("zstd 压缩的 .blend 需要安装 zstandard")
+    reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+    return reader.read()
+
+
+def _packed_data(blend, packed_pointer):
+    """读取 PackedFile 指向的数据"""
+    block = blend.pointers.get(packed_pointer)
+    if block is None:
+        return None
+    size_field = blend.field("PackedFile", "size")
+    data_field = blend.field("PackedFile", "data")
+    size = blend.read_int(block[1], size_field)
+    data_block = blend.pointers.get(blend.read_pointer(block[1], data_field))
+    if data_block is None:
+        return None
+    return blend.block_data(data_block, size)
+
+
+def _image_packed_files(blend, offset):
+    """返回图像的打包数据列表 [(打包时的文件路径, 数据), ...]"""
+    results = []
+
+    packedfiles = blend.field("Image", "packedfiles")
+    if packedfiles is not None:
+        pointer = blend.read_pointer(offset + packedfiles.offset, blend.field("ListBase", "first"))
+        next_field = blend.field("ImagePackedFile", "next")
+        packed_field = blend.field("ImagePackedFile", "packedfile")
+        path_field = blend.field("ImagePackedFile", "filepath")
+        seen = set()
+        while pointer and pointer not in seen:
+            seen.add(pointer)
+            block = blend.pointers.get(pointer)
+            if block is None:
+                break
+            data = _packed_data(blend, blend.read_pointer(block[1], packed_field))
+            if data is not None:
+                results.append((blend.read_string(block[1], path_field), data))
+            pointer = blend.read_pointer(block[1], next_field)
+        return results
+
+    # 2.83 之前的版本只有一个 packedfile 指针
+    packedfile = blend.field("Image", "packedfile")
+    if packedfile is not None:
+        data = _packed_data(blend, blend.read_pointer(offset, packedfile))
+        if data is not None:
+            results.append(("", data))
+    return results
+
+
+def packed_extension(data):
+    for signature, extension in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    return ".bin"
+
+
+def resolve_path(filepath, blend_path):
+    """把 Blender 的 // 相对路径解析为绝对路径"""
+    if not filepath:
+        return ""
+    if filepath.startswith("//"):
+        filepath = os.path.join(os.path.dirname(os.path.abspath(blend_path)), filepath[2:])
+    return os.path.normpath(filepath.replace("\\", os.sep))
+
+
+def read_images(blend):
+    """列出 .blend 中所有 IM 图像块"""
+    structs = blend.sdna.structs
+    id_name = structs["ID"]["name"]
+    id_lib = structs["ID"]["lib"]
+    image_id = blend.field("Image", "id")
+    filepath = blend.field("Image", "filepath") or blend.field("Image", "name")
+    source = blend.field("Image", "source")
+
+    images = []
+    for block in blend.blocks:
+        if block[0] != b"IM\0\0":
+            continue
+        offset = block[1]
+        id_offset = offset + image_id.offset
+        images.append({
+            "name": blend.read_string(id_offset, id_name)[2:],
+            "filepath": blend.read_string(offset, filepath) if filepath else "",
+            "source": IMAGE_SOURCES.get(blend.read_int(offset, source), "UNKNOWN") if source else "UNKNOWN",
+            "linked": bool(blend.read_pointer(id_offset, id_lib)),
+            "packed": _image_packed_files(blend, offset),
+        })
+    return images
+
+
+def scan_file(path, target_dir=None):
+    """扫描单个 .blend 文件，返回可序列化为 JSON 的结果
+
+    target_dir 不为空时把打包的图像提取到该目录。
+
+    任何异常（截断的 gzip、损坏的块、提取时的写入错误等）都记录在 result["error"] 中，
+    不会中断整个批量扫描。
+    """
+    result = {"path": path, "images": []}
+    try:
+        _scan_into(result, path, target_dir)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def extract_filename(name, extension):
+    """由不可信的图像名生成提取文件名：替换路径分隔符，拒绝 . 和 .."""
+    for separator in {"/", "\\", os.sep, os.altsep} - {None}:
+        name = name.replace(separator, "_")
+    name = name.replace("\0", "_")
+    if name in ("", ".", ".."):
+        raise ValueError(f"无效的图像名: {name!r}")
+    return name + extension
+
+
+def _extract_packed(target_dir, name, data):
+    """把打包数据写到 target_dir 中，返回写出的路径"""
+    extracted = os.path.join(target_dir, extract_filename(name, packed_extension(data)))
+    root = os.path.realpath(target_dir)
+    if os.path.commonpath([root, os.path.realpath(extracted)]) != root:
+        raise ValueError(f"提取路径超出目标目录: {name!r}")
+    os.makedirs(target_dir, exist_ok=True)
+    with open(extracted, "wb") as f:
+        f.write(data)
+    return extracted
+
+
+def _scan_into(result, path, target_dir):
+    with BlendFile(path) as blend:
+        result["version"] = blend.version
+        images = read_images(blend)
+
+    for image in images:
+        entry = {
+            "name": image["name"],
+            "filepath": image["filepath"],
+            "resolved_path": resolve_path(image["filepath"], path),
+            "source": image["source"],
+            "linked": image["linked"],
+            "packed": bool(image["packed"]),
+            # 插件导出时的文件名
+            "export_name": image["name"] + ".png",
+        }
+        if image["packed"] and target_dir:
+            # 多视图/UDIM 图像只提取第一份数据，与插件导出一张图像的行为一致
+            # 图像名来自不可信的文件，提取失败只记录在该图像上，不影响其他图像
+            try:
+                entry["extracted"] = _extract_packed(target_dir, image["name"], image["packed"][0][1])
+            except (OSError, ValueError) as e:
+                entry["error"] = f"{type(e).__name__}: {e}"
+        result["images"].append(entry)
+
+
+def iter_blend_files(paths):
+    """产出 (文件路径, 相对扫描根目录的路径)；直接给出的文件相对路径为其文件名"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for fname in sorted(files):
+                    if fname.lower().endswith(".blend"):
+                        filepath = os.path.join(root, fname)
+                        yield filepath, os.path.relpath(filepath, path)
+        else:
+            yield path, os.path.basename(path)
+
+
+def _extract_tasks(paths, extract_dir):
+    """去掉重复的文件，并为每个文件分配唯一的提取子目录"""
+    tasks = []
+    seen = set()
+    used_dirs = set()
+    for path, relative in iter_blend_files(paths):
+        key = os.path.normcase(os.path.abspath(path))
+        if key in seen:
+            continue
+        seen.add(key)
+
+        target_dir = None
+        if extract_dir:
+            subdir = os.path.splitext(relative)[0]
+            if os.path.normcase(subdir) in used_dirs:
+                # 不同扫描根目录下的同名文件
+                subdir += "_" + hashlib.blake2b(key.encode("utf-8"), digest_size=4).hexdigest()
+            used_dirs.add(os.path.normcase(subdir))
+            target_dir = os.path.join(extract_dir, subdir)
+        tasks.append((path, target_dir))
+    return tasks
+
+
+def _scan_task(args):
+    return scan_file(*args)
+
+
+def scan_files(paths, extract_dir=None, jobs=None, chunksize=8):
+    """用进程池扫描多个文件，按输入顺序逐个产出结果"""
+    tasks = _extract_tasks(paths, extract_dir)
+    if jobs == 1:
+        for task in tasks:
+            yield _scan_task(task)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(_scan_task, tasks, chunksize=chunksize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="列出并提取 .blend 文件引用的纹理")
+    parser.add_argument("paths", nargs="+", help=".blend 文件或包含 .blend 的目录")
+    parser.add_argument("--extract", metavar="DIR", help="提取打包图像到该目录（按 .blend 的相对路径分子目录）")
+    parser.add_argument("--jobs", type=int, default=None, help="进程数，默认为 CPU 核心数")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for result in scan_files(args.paths, args.extract, args.jobs):
+        if "error" in result:
+            failed += 1
+        print(json.dumps(result, ensure_ascii=False))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+"""
+程序化材质烘焙
+
+没有任何可达图像纹理的材质（Noise、Voronoi、ColorRamp 等程序化节点驱动）
+在导出前用 CPU Cycles 烘焙出基础色、粗糙度和法线贴图。
+共享同一材质的所有对象一起选中，烘焙到同一组图像中；对象还使用其他材质时烘焙只含该材质的临时副本。
+结果按节点树、所有对象的网格和烘焙设置的哈希缓存在磁盘上，未修改的材质不会重复烘焙。
+"""
+
+import bpy
+import bmesh
+import os
+import hashlib
+import numpy as np
+from . import channel_analysis
+from . import png_writer
+
+# (后缀, 烘焙类型, 通道过滤, 色彩空间)
+BAKE_PASSES = (
+    ("BaseColor", 'DIFFUSE', {'COLOR'}, 'sRGB'),
+    ("Roughness", 'ROUGHNESS', set(), 'Non-Color'),
+    ("Normal", 'NORMAL', set(), 'Non-Color'),
+)
+
+BAKE_SAMPLES = 16
+BAKE_MARGIN = 16
+
+# 计算签名时忽略的节点属性（只影响界面，不影响着色结果）
+_SKIPPED_PROPERTIES = {
+    'rna_type', 'name', 'label', 'location', 'width', 'width_hidden', 'height',
+    'dimensions', 'select', 'hide', 'color', 'use_custom_color', 'parent',
+    'show_options', 'show_preview', 'show_texture', 'internal_links',
+    'inputs', 'outputs', 'type',
+}
+
+
+def default_cache_directory():
+    return bpy.utils.user_resource('DATAFILES', path=os.path.join("texture_exporter", "bake_cache"), create=True)
+
+
+class _TreeSigner:
+    """计算节点树的内容签名，节点组按树缓存"""
+
+    def __init__(self):
+        self._memo = {}
+
+    def tree(self, tree):
+        if tree in self._memo:
+            return self._memo[tree]
+
+        parts = []
+        for node in sorted(tree.nodes, key=lambda n: n.name):
+            inputs = []
+            for socket in node.inputs:
+                if not socket.is_linked and hasattr(socket, "default_value"):
+                    inputs.append((socket.identifier, _plain(socket.default_value)))
+            parts.append((node.bl_idname, node.name, self._values(node, 0), inputs))
+        for link in tree.links:
+            parts.append((
+                link.from_node.name, link.from_socket.identifier,
+                link.to_node.name, link.to_socket.identifier,
+                getattr(link, "is_muted", False),
+            ))
+
+        digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+        self._memo[tree] = digest
+        return digest
+
+    def _values(self, struct, depth):
+        values = []
+        for prop in struct.bl_rna.properties:
+            identifier = prop.identifier
+            if identifier in _SKIPPED_PROPERTIES or identifier.startswith("bl_"):
+                continue
+            value = getattr(struct, identifier, None)
+            if prop.type == 'POINTER':
+                if value is None:
+                    values.append((identifier, None))
+                elif isinstance(value, bpy.types.NodeTree):
+                    values.append((identifier, self.tree(value)))
+                elif isinstance(value, bpy.types.ID):
+                    values.append((identifier, value.name, getattr(value, "filepath", "")))
+                elif depth < 3:
+                    # color_ramp、mapping 等嵌套结构
+                    values.append((identifier, self._values(value, depth + 1)))
+            elif prop.type == 'COLLECTION':
+                if depth < 3:
+                    values.append((identifier, [self._values(item, depth + 1) for item in value]))
+            else:
+                values.append((identifier, _plain(value)))
+        return values
+
+
+def _plain(value):
+    """把 RNA 数组、向量等转换成可稳定 repr 的普通值"""
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, (str, bytes, int, bool)) or value is None:
+        return value
+    try:
+        return tuple(_plain(item) for item in value)
+    except TypeError:
+        return repr(value)
+
+
+def _mesh_signature(obj, depsgraph):
+    """烘焙结果依赖的网格数据：求值后的顶点位置和激活 UV"""
+    evaluated = obj.evaluated_get(depsgraph)
+    mesh = evaluated.to_mesh()
+    try:
+        digest = hashlib.sha1()
+        coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", coords)
+        digest.update(coords.tobytes())
+        if mesh.uv_layers.active is not None:
+            uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+            mesh.uv_layers.active.data.foreach_get("uv", uvs)
+            digest.update(uvs.tobytes())
+        return digest.hexdigest()
+    finally:
+        evaluated.to_mesh_clear()
+
+
+def find_procedural_materials(objects, walker):
+    """找出由程序化节点驱动、没有可达图像纹理的材质
+
+    返回 材质 -> 使用该材质的对象列表，材质和对象都按名称排序，保证缓存键在不同会话间稳定。
+    """
+    materials = {}
+    for obj in objects:
+        if obj.type != 'MESH' or not obj.data.uv_layers:
+            continue
+        for material_slot in obj.material_slots:
+            material = material_slot.material
+            if material is None:
+                continue
+            if material in materials:
+                if obj not in materials[material]:
+                    materials[material].append(obj)
+                continue
+            if not material.use_nodes or material.node_tree is None:
+                continue
+            # 只烘焙由程序化节点驱动、且没有可达图像纹理的材质；常量输入的材质不需要烘焙
+            if walker.material_images(material) or not walker.material_is_procedural(material):
+                continue
+            materials[material] = [obj]
+    return {
+        material: sorted(users, key=lambda obj: obj.name_full)
+        for material, users in sorted(materials.items(), key=lambda item: item[0].name_full)
+    }
+
+
+def _new_image(name, resolution, colorspace):
+    image = bpy.data.images.new(name, resolution, resolution, alpha=True)
+    image.colorspace_settings.name = colorspace
+    return image
+
+
+def _load_cached(path, name, resolution, colorspace):
+    """从缓存 PNG 读入像素到新图像"""
+    cached = bpy.data.images.load(path)
+    try:
+        cached.colorspace_settings.name = colorspace
+        if tuple(cached.size) != (resolution, resolution):
+            return None
+        pixels = np.empty(resolution * resolution * 4, dtype=np.float32)
+        cached.pixels.foreach_get(pixels)
+    finally:
+        bpy.data.images.remove(cached)
+
+    image = _new_image(name, resolution, colorspace)
+    image.pixels.foreach_set(pixels)
+    return image
+
+
+def _store_cached(path, image):
+    """把烘焙结果以 PNG 写入缓存，先写临时文件再重命名"""
+    width, height = image.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    pixels = channel_analysis.quantize_8bit(pixels.reshape(height, width, 4)[::-1])
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(png_writer.encode_png(pixels))
+    os.replace(temp_path, path)
+
+
+def _bake_pass(material, image, bake_type, pass_filter):
+    """把材质的一个通道烘焙到 image，通过临时的激活图像节点指定目标"""
+    nodes = material.node_tree.nodes
+    previous_active = nodes.active
+    node = nodes.new('ShaderNodeTexImage')
+    try:
+        node.image = image
+        nodes.active = node
+        # 未显式指定的选项会取场景的烘焙设置（烘焙到颜色属性、选中到激活等），这里全部固定
+        options = {
+            'type': bake_type,
+            'target': 'IMAGE_TEXTURES',
+            'save_mode': 'INTERNAL',
+            'use_selected_to_active': False,
+            'use_cage': False,
+            'use_clear': True,
+            'margin': BAKE_MARGIN,
+        }
+        if pass_filter:
+            options['pass_filter'] = pass_filter
+        if bake_type == 'NORMAL':
+            options['normal_space'] = 'TANGENT'
+            options['normal_r'] = 'POS_X'
+            options['normal_g'] = 'POS_Y'
+            options['normal_b'] = 'POS_Z'
+        bpy.ops.object.bake(**options)
+    finally:
+        nodes.remove(node)
+        nodes.active = previous_active
+
+
+def _uses_only(obj, material):
+    return all(slot.material == material for slot in obj.material_slots)
+
+
+def _single_material_copy(obj, material, scene):
+    """复制对象，只保留使用该材质的面，并只留下这一个材质槽
+
+    Cycles 会烘焙激活对象的所有材质槽，直接烘焙混合材质的对象会清空并覆盖
+    其他槽中激活的用户图像。
+    """
+    slot_indices = {index for index, slot in enumerate(obj.material_slots) if slot.material == material}
+    mesh = obj.data.copy()
+    bm = bmesh.new()
+    try:
+        bm.from_mesh(mesh)
+        unused = [face for face in bm.faces if face.material_index not in slot_indices]
+        bmesh.ops.delete(bm, geom=unused, context='FACES')
+        for face in bm.faces:
+            face.material_index = 0
+        bm.to_mesh(mesh)
+    finally:
+        bm.free()
+    mesh.materials.clear()
+    mesh.materials.append(material)
+
+    temp = obj.copy()
+    temp.data = mesh
+    for slot in temp.material_slots:
+        slot.link = 'DATA'
+    scene.collection.objects.link(temp)
+    return temp
+
+
+def _remove_copy(temp):
+    mesh = temp.data
+    bpy.data.objects.remove(temp)
+    bpy.data.meshes.remove(mesh)
+
+
+def _bake_material(material, objects, key, resolution, cache_dir, scene, view_layer):
+    """烘焙（或从缓存读取）一个材质的所有通道，返回 (图像列表, 失败的通道名列表)
+
+    objects 中的对象一起选中烘焙，各自的 UV 区域都写入同一张图像。
+    """
+    images = []
+    failed = []
+    targets = None
+    copies = []
+    try:
+        for suffix, bake_type, pass_filter, colorspace in BAKE_PASSES:
+            name = f"{material.name}_{suffix}"
+            path = os.path.join(cache_dir, f"{key}_{suffix}.png")
+            image = None
+            try:
+                if os.path.exists(path):
+                    image = _load_cached(path, name, resolution, colorspace)
+                if image is None:
+                    if targets is None:
+                        # 对象还使用其他材质时，烘焙只含该材质的临时副本
+                        prepared = []
+                        for obj in objects:
+                            if not _uses_only(obj, material):
+                                obj = _single_material_copy(obj, material, scene)
+                                copies.append(obj)
+                            prepared.append(obj)
+                        targets = prepared
+                    image = _new_image(name, resolution, colorspace)
+                    # 只选中烘焙目标，所有使用该材质的对象在一次烘焙中完成
+                    for other in view_layer.objects.selected:
+                        other.select_set(False)
+                    for target in targets:
+                        target.select_set(True)
+                    view_layer.objects.active = targets[0]
+                    _bake_pass(material, image, bake_type, pass_filter)
+                    _store_cached(path, image)
+                images.append(image)
+            except Exception as e:
+                print(f"烘焙失败 {name}: {e}")
+                failed.append(name)
+                if image is not None:
+                    bpy.data.images.remove(image)
+    finally:
+        for copy in copies:
+            _remove_copy(copy)
+    return images, failed
+
+
+def bake_procedural_materials(context, objects, walker, resolution, cache_dir):
+    """烘焙程序化材质
+
+    返回 (新建的图像列表, 烘焙失败的名称列表)。图像由调用方在导出后删除。
+    """
+    materials = find_procedural_materials(objects, walker)
+    if not materials:
+        return [], []
+
+    # 烘焙需要物体模式和 Cycles 插件
+    scene = context.scene
+    if context.mode != 'OBJECT' or not hasattr(scene, "cycles"):
+        return [], [material.name for material in materials]
+
+    cache_dir = cache_dir or default_cache_directory()
+    os.makedirs(cache_dir, exist_ok=True)
+
+    view_layer = context.view_layer
+    depsgraph = context.evaluated_depsgraph_get()
+    signer = _TreeSigner()
+    baked_images = []
+    failed = []
+
+    # 保存选择状态和渲染设置，切换到 CPU Cycles
+    previous_selection = list(view_layer.objects.selected)
+    previous_active = view_layer.objects.active
+    previous_engine = scene.render.engine
+    previous_device = scene.cycles.device
+    previous_samples = scene.cycles.samples
+    scene.render.engine = 'CYCLES'
+    scene.cycles.device = 'CPU'
+    scene.cycles.samples = BAKE_SAMPLES
+
+    try:
+        for material, users in materials.items():
+            key = hashlib.sha1(repr((
+                signer.tree(material.node_tree),
+                tuple(_mesh_signature(obj, depsgraph) for obj in users),
+                resolution, BAKE_MARGIN, BAKE_SAMPLES,
+            )).encode("utf-8")).hexdigest()
+            images, material_failed = _bake_material(
+                material, users, key, resolution, cache_dir, scene, view_layer
+            )
+            baked_images.extend(images)
+            failed.extend(material_failed)
+    finally:
+        scene.cycles.samples = previous_samples
+        scene.cycles.device = previous_device
+        scene.render.engine = previous_engine
+        for obj in view_layer.objects.selected:
+            obj.select_set(False)
+        for obj in previous_selection:
+            obj.select_set(True)
+        view_layer.objects.active = previous_active
+
+    return baked_images, failed
@@ -0,0 +1,49 @@
+"""
+像素通道分析
+
+对像素缓冲区做一次向量化检查，找出恒定的 alpha、相同的 RGB 通道以及完全恒定的图像，
+供编码器选择更精简的输出。
+"""
+
+import numpy as np
+
+# 纯色图像被替换后的尺寸
+CONSTANT_IMAGE_SIZE = 4
+
+
+class ChannelInfo:
+    """通道分析结果"""
+
+    def __init__(self, alpha_constant, opaque, grayscale, constant, first_pixel):
+        self.alpha_constant = alpha_constant
+        self.opaque = opaque
+        self.grayscale = grayscale
+        self.constant = constant
+        self.first_pixel = first_pixel
+
+
+def quantize_8bit(pixels):
+    """把 [0, 1] 的 float 像素量化为 uint8"""
+    return (np.clip(pixels, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+
+def analyze_channels(pixels, opaque_value=None):
+    """分析 (h, w, 4) 像素的通道冗余
+
+    比较是精确的，传入量化后的 uint8 像素时结果对 8 位输出无损。
+    opaque_value 为视为完全不透明的 alpha 值，默认按数据类型取 255 或 1.0。
+    """
+    if opaque_value is None:
+        opaque_value = 255 if pixels.dtype == np.uint8 else 1.0
+
+    first_pixel = pixels[0, 0].copy()
+    alpha = pixels[..., 3]
+    alpha_constant = bool((alpha == first_pixel[3]).all())
+    opaque = alpha_constant and first_pixel[3] == opaque_value
+
+    red = pixels[..., 0]
+    grayscale = bool((red == pixels[..., 1]).all() and (red == pixels[..., 2]).all())
+
+    constant = alpha_constant and bool((pixels[..., :3] == first_pixel[:3]).all())
+
+    return ChannelInfo(alpha_constant, bool(opaque), grayscale, constant, first_pixel)
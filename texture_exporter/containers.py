@@ -0,0 +1,405 @@
+"""
+DDS / KTX2 纹理容器写出
+
+导出时直接从 image.pixels 生成完整的 mip 链（NumPy 向量化的 Box / Kaiser 滤波），
+写入 DDS 或 KTX2 容器，Unity 导入时无需再为每张纹理生成 mipmap。
+
+支持未压缩的 RGBA8 / RGBA16F；块压缩格式（BC1/BC7 等）通过
+register_block_compressor() 注册 BlockCompressor 子类接入。
+"""
+
+import struct
+import numpy as np
+
+# 容器格式 -> 文件扩展名
+CONTAINER_EXTENSIONS = {
+    'DDS': ".dds",
+    'KTX2': ".ktx2",
+}
+
+MIP_FILTERS = ('BOX', 'KAISER')
+PIXEL_FORMATS = ('RGBA8', 'RGBA16F')
+
+# Kaiser 滤波参数：半径以目标像素为单位
+KAISER_RADIUS = 3.0
+KAISER_BETA = 4.0
+
+# DXGI / Vulkan 格式编号
+DXGI_FORMAT_R8G8B8A8_UNORM_SRGB = 29
+VK_FORMAT_R8G8B8A8_UNORM = 37
+VK_FORMAT_R8G8B8A8_SRGB = 43
+VK_FORMAT_R16G16B16A16_SFLOAT = 97
+
+# DDS 头部标志
+_DDSD_CAPS = 0x1
+_DDSD_HEIGHT = 0x2
+_DDSD_WIDTH = 0x4
+_DDSD_PITCH = 0x8
+_DDSD_PIXELFORMAT = 0x1000
+_DDSD_MIPMAPCOUNT = 0x20000
+_DDSD_LINEARSIZE = 0x80000
+_DDPF_ALPHAPIXELS = 0x1
+_DDPF_FOURCC = 0x4
+_DDPF_RGB = 0x40
+_DDSCAPS_COMPLEX = 0x8
+_DDSCAPS_TEXTURE = 0x1000
+_DDSCAPS_MIPMAP = 0x400000
+_D3DFMT_A16B16G16R16F = 113
+_D3D10_RESOURCE_DIMENSION_TEXTURE2D = 3
+
+_KTX2_IDENTIFIER = bytes([0xAB, 0x4B, 0x54, 0x58, 0x20, 0x32, 0x30, 0xBB, 0x0D, 0x0A, 0x1A, 0x0A])
+
+# KTX2 数据格式描述符（DFD）常量
+_KHR_DF_MODEL_RGBSDA = 1
+_KHR_DF_PRIMARIES_BT709 = 1
+_KHR_DF_TRANSFER_LINEAR = 1
+_KHR_DF_TRANSFER_SRGB = 2
+_KHR_DF_CHANNEL_ALPHA = 15
+_KHR_DF_SAMPLE_LINEAR = 0x10
+_KHR_DF_SAMPLE_SIGNED = 0x40
+_KHR_DF_SAMPLE_FLOAT = 0x80
+
+
+class BlockCompressor:
+    """块压缩器扩展点
+
+    子类实现 compress()，把一级 mip（自上而下、float32、形状 (h, w, 4)）
+    压缩成字节串，然后通过 register_block_compressor() 注册。
+    """
+    name = ""
+    label = ""
+    block_width = 4
+    block_height = 4
+    bytes_per_block = 16
+    dxgi_format = 0
+    dxgi_format_srgb = 0
+    vk_format = 0
+    vk_format_srgb = 0
+
+    def compress(self, level, srgb):
+        raise NotImplementedError
+
+    def ktx2_dfd(self, srgb):
+        """返回 KTX2 的数据格式描述块（不含 dfdTotalSize），不支持 KTX2 时返回 None"""
+        return None
+
+    def level_size(self, width, height):
+        blocks_x = (width + self.block_width - 1) // self.block_width
+        blocks_y = (height + self.block_height - 1) // self.block_height
+        return blocks_x * blocks_y * self.bytes_per_block
+
+
+_block_compressors = {}
+# EnumProperty 动态 items 返回的字符串必须由 Python 持有引用，否则 Blender 可能读到已释放的内存，
+# 因此列表保存在模块级，只在注册变化时重建
+_block_compressor_items = [('NONE', "None", "不压缩，写出原始像素")]
+
+
+def _rebuild_block_compressor_items():
+    items = [('NONE', "None", "不压缩，写出原始像素")]
+    for name, compressor in sorted(_block_compressors.items()):
+        items.append((name, compressor.label or name, ""))
+    _block_compressor_items[:] = items
+
+
+def register_block_compressor(compressor):
+    """注册块压缩器实例，名称重复时覆盖旧的注册"""
+    if not compressor.name:
+        raise ValueError("块压缩器必须设置 name")
+    _block_compressors[compressor.name] = compressor
+    _rebuild_block_compressor_items()
+
+
+def unregister_block_compressor(name):
+    _block_compressors.pop(name, None)
+    _rebuild_block_compressor_items()
+
+
+def get_block_compressor(name):
+    """按名称获取块压缩器，'NONE' 或空名称返回 None"""
+    if not name or name == 'NONE':
+        return None
+    try:
+        return _block_compressors[name]
+    except KeyError:
+        raise ValueError(f"未注册的块压缩器: {name}")
+
+
+def block_compressor_items():
+    """供 EnumProperty 使用的块压缩器列表（模块级对象，注册变化时原地更新）"""
+    return _block_compressor_items
+
+
+# ---------------------------------------------------------------------------
+# mip 链生成
+# ---------------------------------------------------------------------------
+
+def srgb_to_linear(values):
+    return np.where(values <= 0.04045, values / 12.92, ((values + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(values):
+    values = np.maximum(values, 0.0)
+    return np.where(values <= 0.0031308, values * 12.92, 1.055 * values ** (1.0 / 2.4) - 0.055)
+
+
+def _box_taps(src_size, dst_size):
+    """按面积重叠计算 Box 滤波的采样索引与权重"""
+    scale = src_size / dst_size
+    tap_count = int(np.ceil(scale)) + 1
+    starts = np.arange(dst_size) * scale
+    first = np.floor(starts).astype(np.int64)
+    indices = first[:, None] + np.arange(tap_count)[None, :]
+    lower = np.maximum(indices, starts[:, None])
+    upper = np.minimum(indices + 1, (starts + scale)[:, None])
+    weights = np.maximum(upper - lower, 0.0)
+    return indices, weights
+
+
+def _kaiser_taps(src_size, dst_size):
+    """Kaiser 窗口化 sinc 滤波的采样索引与权重"""
+    scale = src_size / dst_size
+    support = KAISER_RADIUS * scale
+    centers = (np.arange(dst_size) + 0.5) * scale
+    first = np.floor(centers - support).astype(np.int64)
+    tap_count = int(np.ceil(2 * support)) + 1
+    indices = first[:, None] + np.arange(tap_count)[None, :]
+    offsets = (indices + 0.5 - centers[:, None]) / scale
+    ratio = np.clip(offsets / KAISER_RADIUS, -1.0, 1.0)
+    window = np.i0(KAISER_BETA * np.sqrt(1.0 - ratio * ratio)) / np.i0(KAISER_BETA)
+    weights = np.sinc(offsets) * window
+    weights[np.abs(offsets) >= KAISER_RADIUS] = 0.0
+    return indices, weights
+
+
+def _downsample_axis(data, axis, dst_size, mip_filter):
+    src_size = data.shape[axis]
+    if src_size == dst_size:
+        return data
+    if mip_filter == 'KAISER':
+        indices, weights = _kaiser_taps(src_size, dst_size)
+    else:
+        indices, weights = _box_taps(src_size, dst_size)
+    weights = weights / weights.sum(axis=1, keepdims=True)
+    # 边缘按 clamp 方式处理
+    indices = np.clip(indices, 0, src_size - 1)
+
+    shape = [1] * data.ndim
+    shape[axis] = dst_size
+    result = np.zeros(data.shape[:axis] + (dst_size,) + data.shape[axis + 1:], dtype=np.float32)
+    for tap in range(indices.shape[1]):
+        result += np.take(data, indices[:, tap], axis=axis) * weights[:, tap].reshape(shape)
+    return result
+
+
+def mip_count(width, height):
+    return int(max(width, height)).bit_length()
+
+
+def generate_mip_chain(pixels, mip_filter='BOX', srgb=False):
+    """从 (h, w, 4) 的 float 像素生成完整 mip 链
+
+    srgb 为 True 时颜色通道先转换到线性空间再滤波，输出保持原编码。
+    """
+    if mip_filter not in MIP_FILTERS:
+        raise ValueError(f"不支持的 mip 滤波: {mip_filter}")
+
+    base = np.ascontiguousarray(pixels, dtype=np.float32)
+    height, width = base.shape[:2]
+
+    current = base.copy()
+    if srgb:
+        current[..., :3] = srgb_to_linear(current[..., :3])
+
+    levels = [base]
+    for _ in range(1, mip_count(width, height)):
+        height = max(1, height // 2)
+        width = max(1, width // 2)
+        current = _downsample_axis(current, 0, height, mip_filter)
+        current = _downsample_axis(current, 1, width, mip_filter)
+        if mip_filter == 'KAISER':
+            # sinc 振铃可能产生负值
+            np.maximum(current, 0.0, out=current)
+
+        level = current.copy()
+        if srgb:
+            level[..., :3] = linear_to_srgb(level[..., :3])
+        levels.append(level)
+    return levels
+
+
+# ---------------------------------------------------------------------------
+# 容器编码
+# ---------------------------------------------------------------------------
+
+def _pack_level(level, pixel_format, srgb):
+    if pixel_format == 'RGBA8':
+        return (np.clip(level, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8).tobytes()
+    if pixel_format == 'RGBA16F':
+        # 浮点格式没有 sRGB 变体，颜色通道按线性值存储
+        if srgb:
+            level = level.copy()
+            level[..., :3] = srgb_to_linear(level[..., :3])
+        return level.astype('<f2').tobytes()
+    raise ValueError(f"不支持的像素格式: {pixel_format}")
+
+
+def _encode_levels(levels, pixel_format, srgb, compressor):
+    if compressor is not None:
+        return [compressor.compress(level, srgb) for level in levels]
+    return [_pack_level(level, pixel_format, srgb) for level in levels]
+
+
+def encode_dds(levels, pixel_format='RGBA8', srgb=False, compressor=None):
+    """把 mip 链编码为 DDS 字节串
+
+    未压缩的线性格式使用传统像素格式头以获得最好的兼容性；传统头无法标记 sRGB，
+    sRGB 的 RGBA8 和块压缩格式使用 DX10 扩展头。
+    """
+    height, width = levels[0].shape[:2]
+    data = _encode_levels(levels, pixel_format, srgb, compressor)
+
+    flags = _DDSD_CAPS | _DDSD_HEIGHT | _DDSD_WIDTH | _DDSD_PIXELFORMAT
+    caps = _DDSCAPS_TEXTURE
+    if len(levels) > 1:
+        flags |= _DDSD_MIPMAPCOUNT
+        caps |= _DDSCAPS_COMPLEX | _DDSCAPS_MIPMAP
+
+    dx10_pixel_format = struct.pack("<II4s5I", 32, _DDPF_FOURCC, b"DX10", 0, 0, 0, 0, 0)
+    dx10_header = b""
+    if compressor is not None:
+        flags |= _DDSD_LINEARSIZE
+        pitch_or_size = len(data[0])
+        pixel_format_header = dx10_pixel_format
+        dxgi_format = compressor.dxgi_format_srgb if srgb else compressor.dxgi_format
+        dx10_header = struct.pack("<5I", dxgi_format, _D3D10_RESOURCE_DIMENSION_TEXTURE2D, 0, 1, 0)
+    elif pixel_format == 'RGBA8' and srgb:
+        flags |= _DDSD_PITCH
+        pitch_or_size = width * 4
+        pixel_format_header = dx10_pixel_format
+        dx10_header = struct.pack(
+            "<5I", DXGI_FORMAT_R8G8B8A8_UNORM_SRGB, _D3D10_RESOURCE_DIMENSION_TEXTURE2D, 0, 1, 0,
+        )
+    elif pixel_format == 'RGBA8':
+        flags |= _DDSD_PITCH
+        pitch_or_size = width * 4
+        pixel_format_header = struct.pack(
+            "<II4s5I", 32, _DDPF_RGB | _DDPF_ALPHAPIXELS, b"\0\0\0\0", 32,
+            0x000000FF, 0x0000FF00, 0x00FF0000, 0xFF000000,
+        )
+    else:
+        flags |= _DDSD_PITCH
+        pitch_or_size = width * 8
+        pixel_format_header = struct.pack(
+            "<III5I", 32, _DDPF_FOURCC, _D3DFMT_A16B16G16R16F, 0, 0, 0, 0, 0,
+        )
+
+    header = struct.pack(
+        "<7I44x", 124, flags, height, width, pitch_or_size, 0, len(levels),
+    ) + pixel_format_header + struct.pack("<4I4x", caps, 0, 0, 0)
+
+    return b"".join([b"DDS ", header, dx10_header] + data)
+
+
+def _ktx2_basic_dfd(pixel_format, srgb):
+    """未压缩 RGBA 的 KHR_DF 基本描述块"""
+    if pixel_format == 'RGBA8':
+        channel_bits, bytes_per_texel = 8, 4
+        qualifiers = 0
+        lower, upper = 0, 255
+    else:
+        channel_bits, bytes_per_texel = 16, 8
+        qualifiers = _KHR_DF_SAMPLE_FLOAT | _KHR_DF_SAMPLE_SIGNED
+        lower, upper = 0xBF800000, 0x3F800000  # -1.0f, 1.0f
+
+    transfer = _KHR_DF_TRANSFER_SRGB if srgb and pixel_format == 'RGBA8' else _KHR_DF_TRANSFER_LINEAR
+    samples = b""
+    for index, channel in enumerate((0, 1, 2, _KHR_DF_CHANNEL_ALPHA)):
+        channel_type = channel | qualifiers
+        if channel == _KHR_DF_CHANNEL_ALPHA and transfer == _KHR_DF_TRANSFER_SRGB:
+            channel_type |= _KHR_DF_SAMPLE_LINEAR
+        word0 = (index * channel_bits) | ((channel_bits - 1) << 16) | (channel_type << 24)
+        samples += struct.pack("<4I", word0, 0, lower, upper)
+
+    block_size = 24 + len(samples)
+    return struct.pack(
+        "<6I",
+        0,
+        2 | (block_size << 16),
+        _KHR_DF_MODEL_RGBSDA | (_KHR_DF_PRIMARIES_BT709 << 8) | (transfer << 16),
+        0,
+        bytes_per_texel,
+        0,
+    ) + samples
+
+
+def _ktx2_key_values(pairs):
+    data = b""
+    for key, value in pairs:
+        entry = key.encode("utf-8") + b"\0" + value.encode("utf-8") + b"\0"
+        data += struct.pack("<I", len(entry)) + entry
+        data += b"\0" * (-len(entry) % 4)
+    return data
+
+
+def encode_ktx2(levels, pixel_format='RGBA8', srgb=False, compressor=None):
+    """把 mip 链编码为 KTX2 字节串（无超压缩）"""
+    height, width = levels[0].shape[:2]
+    data = _encode_levels(levels, pixel_format, srgb, compressor)
+
+    if compressor is not None:
+        dfd_block = compressor.ktx2_dfd(srgb)
+        if dfd_block is None:
+            raise ValueError(f"块压缩器 {compressor.name} 不支持 KTX2")
+        vk_format = compressor.vk_format_srgb if srgb else compressor.vk_format
+        type_size = 1
+        alignment = max(compressor.bytes_per_block, 4)
+    elif pixel_format == 'RGBA8':
+        dfd_block = _ktx2_basic_dfd(pixel_format, srgb)
+        vk_format = VK_FORMAT_R8G8B8A8_SRGB if srgb else VK_FORMAT_R8G8B8A8_UNORM
+        type_size = 1
+        alignment = 4
+    else:
+        dfd_block = _ktx2_basic_dfd(pixel_format, srgb)
+        vk_format = VK_FORMAT_R16G16B16A16_SFLOAT
+        type_size = 2
+        alignment = 8
+
+    dfd = struct.pack("<I", 4 + len(dfd_block)) + dfd_block
+    kvd = _ktx2_key_values([("KTXorientation", "rd"), ("KTXwriter", "Blender Texture Exporter")])
+
+    level_count = len(levels)
+    dfd_offset = 80 + 24 * level_count
+    kvd_offset = dfd_offset + len(dfd)
+    offset = kvd_offset + len(kvd)
+
+    # 数据区按从小到大的顺序存放 mip，级别索引仍按从大到小排列
+    body = b""
+    level_index = [None] * level_count
+    for level in reversed(range(level_count)):
+        padding = -offset % alignment
+        body += b"\0" * padding
+        offset += padding
+        level_index[level] = struct.pack("<3Q", offset, len(data[level]), len(data[level]))
+        body += data[level]
+        offset += len(data[level])
+
+    header = _KTX2_IDENTIFIER + struct.pack(
+        "<9I", vk_format, type_size, width, height, 0, 0, 1, level_count, 0,
+    ) + struct.pack("<4I2Q", dfd_offset, len(dfd), kvd_offset, len(kvd), 0, 0)
+
+    return b"".join([header] + level_index + [dfd, kvd, body])
+
+
+def encode_container(pixels, container='DDS', pixel_format='RGBA8', mip_filter='BOX',
+                     srgb=False, compressor=None):
+    """生成 mip 链并编码成指定容器格式
+
+    pixels 为自上而下排列的 (h, w, 4) float 数组。
+    """
+    levels = generate_mip_chain(pixels, mip_filter, srgb)
+    if container == 'DDS':
+        return encode_dds(levels, pixel_format, srgb, compressor)
+    if container == 'KTX2':
+        return encode_ktx2(levels, pixel_format, srgb, compressor)
+    raise ValueError(f"不支持的容器格式: {container}")
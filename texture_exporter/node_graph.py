@@ -0,0 +1,189 @@
+"""
+材质节点图遍历
+
+从激活的材质输出节点沿连线反向遍历，只收集真正参与着色的图像纹理节点，
+并递归进入节点组（ShaderNodeGroup.node_tree）。同一个节点组的分析结果按
+(节点树, 输出接口) 缓存，被多个材质共享的节点组只分析一次。
+
+每张图像同时记录其采样坐标来自哪个 UV 层："" 表示渲染激活的 UV 层，
+None 表示坐标经过变换（Mapping、投影、组输入等），无法由 UV 推出覆盖范围。
+"""
+
+# 可能带有材质的对象类型
+MATERIAL_OBJECT_TYPES = {'MESH', 'CURVE', 'SURFACE', 'FONT', 'META'}
+
+# 程序化纹理节点（Noise、Voronoi、ColorRamp 等），材质中可达时需要烘焙
+PROCEDURAL_NODE_TYPES = {
+    'TEX_NOISE', 'TEX_VORONOI', 'TEX_MUSGRAVE', 'TEX_WAVE', 'TEX_MAGIC',
+    'TEX_GRADIENT', 'TEX_CHECKER', 'TEX_BRICK', 'TEX_WHITE_NOISE', 'TEX_GABOR',
+    'TEX_POINTDENSITY', 'VALTORGB',
+}
+
+
+class NodeGraphWalker:
+    """可达性遍历器，在一次收集过程中复用材质与节点组的缓存"""
+
+    def __init__(self):
+        # 材质 -> ({图像: UV 层集合}, 是否有可达的程序化节点)
+        self._material_cache = {}
+        # (节点组树, 组输出接口标识) -> ({图像: UV 层集合}, 到达的组输入接口标识集合, 是否有程序化节点)
+        self._group_cache = {}
+
+    def _material(self, material):
+        if material in self._material_cache:
+            return self._material_cache[material]
+
+        images = {}
+        procedural = False
+        if material.use_nodes and material.node_tree is not None:
+            for node in material.node_tree.nodes:
+                if node.type == 'OUTPUT_MATERIAL' and node.is_active_output:
+                    found, _, found_procedural = self._walk(node.inputs)
+                    _merge_uses(images, found)
+                    procedural = procedural or found_procedural
+
+        result = (_freeze_uses(images), procedural)
+        self._material_cache[material] = result
+        return result
+
+    def material_images(self, material):
+        """返回材质中从激活输出节点可达的图像"""
+        return frozenset(self._material(material)[0])
+
+    def material_image_uv_maps(self, material):
+        """返回 图像 -> 采样使用的 UV 层集合（元素含义见模块说明）"""
+        return self._material(material)[0]
+
+    def material_is_procedural(self, material):
+        """材质中是否有从激活输出节点可达的程序化纹理节点"""
+        return self._material(material)[1]
+
+    def _group_output(self, tree, identifier):
+        """分析节点组某个输出接口依赖的图像和组输入"""
+        key = (tree, identifier)
+        if key in self._group_cache:
+            return self._group_cache[key]
+
+        images = {}
+        group_inputs = set()
+        procedural = False
+        for node in tree.nodes:
+            if node.type == 'GROUP_OUTPUT' and node.is_active_output:
+                sockets = [socket for socket in node.inputs if socket.identifier == identifier]
+                found, reached, found_procedural = self._walk(sockets)
+                _merge_uses(images, found)
+                group_inputs |= reached
+                procedural = procedural or found_procedural
+
+        result = (_freeze_uses(images), frozenset(group_inputs), procedural)
+        self._group_cache[key] = result
+        return result
+
+    def _walk(self, sockets):
+        """从一组输入接口沿连线反向遍历同一节点树
+
+        返回 ({图像: UV 层集合}, 到达的组输入接口标识集合, 是否有程序化节点)。
+        """
+        images = {}
+        group_inputs = set()
+        procedural = False
+        visited = set()
+        pending = list(sockets)
+
+        while pending:
+            socket = pending.pop()
+            if not socket.is_linked:
+                continue
+            for link in socket.links:
+                if getattr(link, "is_muted", False) or not link.is_valid:
+                    continue
+                node = link.from_node
+
+                if node.type == 'GROUP_INPUT':
+                    group_inputs.add(link.from_socket.identifier)
+                    continue
+
+                if node.type == 'GROUP':
+                    # 节点组按输出接口分别分析，只跟随该输出依赖的组输入
+                    key = (node, link.from_socket.identifier)
+                    if key in visited:
+                        continue
+                    visited.add(key)
+                    if node.node_tree is None:
+                        continue
+                    found, reached, found_procedural = self._group_output(
+                        node.node_tree, link.from_socket.identifier
+                    )
+                    _merge_uses(images, found)
+                    procedural = procedural or found_procedural
+                    pending.extend(s for s in node.inputs if s.identifier in reached)
+                    continue
+
+                if node in visited:
+                    continue
+                visited.add(node)
+
+                if node.type == 'TEX_IMAGE':
+                    image = node.image
+                    if image is not None and image.name:
+                        images.setdefault(image, set()).add(_image_uv_map(node))
+                elif node.type in PROCEDURAL_NODE_TYPES:
+                    procedural = True
+                pending.extend(node.inputs)
+
+        return images, group_inputs, procedural
+
+
+def _active_links(socket):
+    return [link for link in socket.links if link.is_valid and not getattr(link, "is_muted", False)]
+
+
+def _image_uv_map(node):
+    """图像纹理节点采样使用的 UV 层
+
+    Vector 未连接时为 ""（渲染激活的 UV 层）；直接连接 UV Map 节点时为该节点的 UV 层名；
+    其他任何坐标来源或非平面投影返回 None。
+    """
+    if node.projection != 'FLAT':
+        return None
+    vector = node.inputs[0]
+    links = _active_links(vector) if vector.is_linked else []
+    if not links:
+        return ""
+    source = links[0].from_node
+    if source.type == 'UVMAP' and not source.mute:
+        return source.uv_map
+    return None
+
+
+def _merge_uses(target, found):
+    for image, uv_maps in found.items():
+        target.setdefault(image, set()).update(uv_maps)
+
+
+def _freeze_uses(images):
+    return {image: frozenset(uv_maps) for image, uv_maps in images.items()}
+
+
+def iter_materials(objects):
+    """遍历对象材质槽中的材质"""
+    for obj in objects:
+        # 只处理可能有材质的对象类型（网格、曲线等）
+        if obj.type not in MATERIAL_OBJECT_TYPES:
+            continue
+        # 检查对象是否真的有材质槽
+        if not getattr(obj, 'material_slots', None):
+            continue
+        for material_slot in obj.material_slots:
+            if material_slot.material is not None:
+                yield obj, material_slot.material
+
+
+def collect_images(objects, walker=None):
+    """收集对象材质中所有可达的图像（去重）"""
+    if walker is None:
+        walker = NodeGraphWalker()
+    images = set()
+    for _, material in iter_materials(objects):
+        images |= walker.material_images(material)
+    return images
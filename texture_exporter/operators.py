@@ -1,8 +1,156 @@
 import bpy
 import os
+import json
+import numpy as np
 from bpy.types import Operator
 from bpy.props import StringProperty, IntProperty
 from bpy_extras.io_utils import ExportHelper
+from . import baking
+from . import channel_analysis
+from . import containers
+from . import node_graph
+from . import png_writer
+from . import texture_cache
+from . import uv_crop
+from . import writer
+
+# 导出清单文件名，记录需要 Unity 端额外处理的纹理
+MANIFEST_FILENAME = "texture_manifest.json"
+
+# 编码器版本，编码输出发生变化时递增以使缓存失效
+ENCODER_VERSION = 1
+
+def _read_pixels(image):
+    """读取图像像素为自上而下的 (h, w, 4) float32 数组"""
+    width, height = image.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    # Blender 的像素按自下而上存储，容器格式要求自上而下
+    return pixels.reshape(height, width, 4)[::-1]
+
+def _is_srgb_encoded(image):
+    """字节图像的像素保持原始 sRGB 编码，浮点图像为线性值"""
+    return not image.is_float and image.colorspace_settings.name == 'sRGB'
+
+def _encoder_settings(image, prefs):
+    """影响编码结果的全部设置，作为缓存键的一部分"""
+    return (
+        ENCODER_VERSION,
+        prefs.export_format,
+        prefs.pixel_format,
+        prefs.mip_filter,
+        prefs.block_compressor,
+        prefs.optimize_png_channels,
+        prefs.collapse_constant_images,
+        _is_srgb_encoded(image),
+    )
+
+def _encode_image(image, pixels, prefs):
+    """编码像素，返回 (编码数据, 清单条目或 None)"""
+    optimize_png = prefs.export_format == 'PNG' and prefs.optimize_png_channels
+    info = None
+    if optimize_png or prefs.collapse_constant_images:
+        info = channel_analysis.analyze_channels(pixels)
+
+    note = None
+    if prefs.collapse_constant_images and info.constant:
+        # 纯色图像用很小的图像代替，原始尺寸记录在清单中
+        size = channel_analysis.CONSTANT_IMAGE_SIZE
+        color = info.first_pixel / 255.0 if pixels.dtype == np.uint8 else info.first_pixel
+        pixels = np.broadcast_to(info.first_pixel, (size, size, 4))
+        note = {
+            "constant": True,
+            "color": [round(float(value), 6) for value in color],
+            "original_size": list(image.size),
+        }
+
+    if prefs.export_format == 'PNG':
+        if optimize_png:
+            color_type = png_writer.select_color_type(info)
+        else:
+            color_type = png_writer.COLOR_TYPE_RGBA
+        data = png_writer.encode_png(pixels, color_type)
+    else:
+        data = containers.encode_container(
+            pixels,
+            container=prefs.export_format,
+            pixel_format=prefs.pixel_format,
+            mip_filter=prefs.mip_filter,
+            srgb=_is_srgb_encoded(image),
+            compressor=containers.get_block_compressor(prefs.block_compressor),
+        )
+    return data, note
+
+def _export_image(image, export_dir, prefs, manifest, file_writer, cache=None, region=None):
+    """按偏好设置的格式导出单张图像，需要说明的信息写入 manifest
+
+    编码结果交给 file_writer 在后台写出。
+    region 为 UV 裁剪区域 (x0, y0, x1, y1)，为 None 时导出整张图像。
+    """
+    if prefs.export_format == 'PNG' and image.is_float:
+        # 浮点图像需要经过色彩管理写出 8 位 PNG，结果依赖场景设置，不裁剪也不进入缓存
+        filepath = os.path.join(export_dir, image.name + ".png")
+        temp_path = writer.temp_path_for(filepath)
+        try:
+            image.save_render(temp_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        file_writer.submit_file(temp_path, filepath)
+        return filepath
+
+    pixels = _read_pixels(image)
+    if region is not None:
+        pixels = uv_crop.crop_pixels(pixels, region)
+    if prefs.export_format == 'PNG':
+        filename = image.name + ".png"
+        pixels = channel_analysis.quantize_8bit(pixels)
+    else:
+        filename = image.name + containers.CONTAINER_EXTENSIONS[prefs.export_format]
+    if region is not None:
+        manifest.setdefault(filename, {}).update(uv_crop.crop_note(region, tuple(image.size)))
+    filepath = os.path.join(export_dir, filename)
+
+    # 缓存命中时跳过编码：硬链接模式把缓存文件链接到临时文件，否则把缓存数据交给 file_writer 写出
+    key = None
+    if cache is not None:
+        key = cache.key(pixels, _encoder_settings(image, prefs))
+        fetched = cache.fetch(key)
+        if fetched is not None:
+            metadata, data = fetched
+            if metadata.get("note"):
+                manifest.setdefault(filename, {}).update(metadata["note"])
+            if cache.link_mode == 'HARDLINK':
+                temp_path = writer.temp_path_for(filepath)
+                if cache.link(key, temp_path):
+                    # 缓存文件已经落盘，不需要再 fsync
+                    file_writer.submit_file(temp_path, filepath, sync=False)
+                    return filepath
+            file_writer.submit(filepath, data)
+            return filepath
+
+    data, note = _encode_image(image, pixels, prefs)
+    if note:
+        manifest.setdefault(filename, {}).update(note)
+    if cache is not None:
+        try:
+            cache.store(key, data, {"note": note})
+        except OSError as e:
+            print(f"写入缓存失败 {image.name}: {e}")
+
+    file_writer.submit(filepath, data)
+    return filepath
+
+def _write_manifest(export_dir, manifest, file_writer):
+    """写出导出清单，没有需要说明的条目时删除旧清单"""
+    filepath = os.path.join(export_dir, MANIFEST_FILENAME)
+    if not manifest:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        return
+    data = json.dumps({"textures": manifest}, indent=2, ensure_ascii=False, sort_keys=True)
+    file_writer.submit(filepath, data.encode("utf-8"))
 
 def _export_textures_core(self, context, export_dir):
     """核心导出逻辑，供所有导出操作调用"""
@@ -20,49 +168,77 @@ def _export_textures_core(self, context, export_dir):
     # 合并选中的和可见的对象，并去重
     all_objects = list(set(selected_objects) | set(visible_objects))
 
-    # 收集需要导出的图像（使用集合避免重复）
-    images_to_export = set()
-
-    # 遍历所有相关对象
-    for obj in all_objects:
-        # 只处理可能有材质的对象类型（网格、曲线等）
-        if obj.type in {'MESH', 'CURVE', 'SURFACE', 'FONT', 'META'}:
-            # 检查对象是否真的有材质槽
-            if hasattr(obj, 'material_slots') and obj.material_slots:
-                # 遍历对象的材质槽
-                for material_slot in obj.material_slots:
-                    material = material_slot.material
-                    if material is not None:
-                        # 检查材质是否使用节点系统
-                        if material.use_nodes:
-                            # 遍历材质的所有节点
-                            for node in material.node_tree.nodes:
-                                # 只处理图像纹理节点
-                                if node.type == 'TEX_IMAGE':
-                                    image = node.image
-                                    # 确保图像有效且有名称
-                                    if image is not None and image.name:
-                                        images_to_export.add(image)
-
-    # 导出收集到的图像
+    prefs = context.preferences.addons[__package__].preferences
+    walker = node_graph.NodeGraphWalker()
+
+    # 烘焙没有图像纹理的程序化材质
+    baked_images = []
+    bake_failed = []
+    if prefs.bake_procedural:
+        baked_images, bake_failed = baking.bake_procedural_materials(
+            context, all_objects, walker, int(prefs.bake_resolution),
+            bpy.path.abspath(prefs.bake_cache_directory),
+        )
+
+    # 收集需要导出的图像：从材质输出节点反向遍历，包括节点组内部
+    images_to_export = node_graph.collect_images(all_objects, walker)
+    images_to_export.update(baked_images)
+
+    # 按 UV 覆盖范围计算裁剪区域
+    crop_regions = {}
+    if prefs.crop_to_uv:
+        crop_regions = uv_crop.compute_crop_regions(
+            all_objects, walker, prefs.crop_padding, context.evaluated_depsgraph_get()
+        )
+
+    # 编码结果缓存
+    cache = None
+    if prefs.use_encoded_cache:
+        cache = texture_cache.TextureCache(
+            bpy.path.abspath(prefs.encoded_cache_directory) or texture_cache.default_cache_directory(),
+            prefs.encoded_cache_size_mb * 1024 * 1024,
+            prefs.encoded_cache_link_mode,
+        )
+
+    # 导出收集到的图像：编码在当前线程进行，文件由后台写线程写出
+    manifest = {}
     export_count = 0
     failed_count = 0
+    file_writer = writer.WriteBehindWriter()
+
+    try:
+        for image in images_to_export:
+            # 检查图像是否有有效数据
+            if image.has_data and image.name:
+                try:
+                    # 保存图像
+                    _export_image(image, export_dir, prefs, manifest, file_writer, cache, crop_regions.get(image))
+                    export_count += 1
+                except Exception as e:
+                    print(f"导出失败 {image.name}: {e}")
+                    failed_count += 1
+
+        _write_manifest(export_dir, manifest, file_writer)
+    finally:
+        write_failed = file_writer.close()
 
-    for image in images_to_export:
-        # 检查图像是否有有效数据
-        if image.has_data and image.name:
-            # 构建完整的文件路径，使用PNG格式
-            filepath = os.path.join(export_dir, image.name + ".png")
-            try:
-                # 保存图像
-                image.save_render(filepath)
-                export_count += 1
-            except Exception as e:
-                print(f"导出失败 {image.name}: {e}")
-                failed_count += 1
+    # 写出失败的纹理计入失败数量
+    manifest_path = os.path.join(export_dir, MANIFEST_FILENAME)
+    write_failed_count = len([path for path, _ in write_failed if path != manifest_path])
+    export_count -= write_failed_count
+    failed_count += write_failed_count
+
+    if cache is not None:
+        try:
+            cache.evict()
+        except OSError as e:
+            print(f"清理缓存失败: {e}")
+
+    # 烘焙生成的图像只用于导出
+    for image in baked_images:
+        bpy.data.images.remove(image)
 
     # 添加到历史记录
-    prefs = context.preferences.addons[__package__].preferences
     prefs.add_to_history(export_dir)
     prefs.export_directory = export_dir
 
@@ -71,7 +247,11 @@ def _export_textures_core(self, context, export_dir):
         message = f"成功导出 {export_count} 个纹理文件"
         if failed_count > 0:
             message += f"，{failed_count} 个失败"
+        if bake_failed:
+            message += f"，{len(bake_failed)} 个烘焙失败"
         self.report({'INFO'}, message)
+    elif bake_failed:
+        self.report({'WARNING'}, f"没有找到可导出的纹理，{len(bake_failed)} 个烘焙失败")
     else:
         self.report({'WARNING'}, "没有找到可导出的纹理")
 
@@ -1,5 +1,6 @@
 import bpy
 from bpy.types import Panel
+from . import node_graph
 
 class TEXTURE_EXPORTER_PT_main_panel(Panel):
     """纹理导出器主面板"""
@@ -16,6 +17,7 @@ class TEXTURE_EXPORTER_PT_main_panel(Panel):
         # 主要导出按钮
         col = layout.column(align=True)
         col.operator("texture_exporter.export_textures", text="选择目录并导出")
+        layout.prop(prefs, "export_format")
         
         # 快速导出按钮（如果有上次目录）
         if prefs.export_directory:
@@ -73,8 +75,12 @@ class TEXTURE_EXPORTER_PT_info_panel(Panel):
         box.label(text="说明:")
         box.label(text="• 导出选中和可见对象的纹理")
         box.label(text="• 支持网格、曲线等对象类型")
-        box.label(text="• 只导出图像纹理节点")
-        box.label(text="• 格式为PNG")
+        box.label(text="• 只导出连接到材质输出的图像纹理（含节点组）")
+        prefs = context.preferences.addons[__package__].preferences
+        if prefs.export_format == 'PNG':
+            box.label(text="• 格式为PNG")
+        else:
+            box.label(text=f"• 格式为{prefs.export_format}（含完整mip链）")
     
     def count_exportable_images(self, context):
         """计算可导出的图像数量"""
@@ -82,19 +88,9 @@ class TEXTURE_EXPORTER_PT_info_panel(Panel):
         visible_objects = context.visible_objects
         all_objects = list(set(selected_objects) | set(visible_objects))
         
-        images_to_export = set()
-        
-        for obj in all_objects:
-            if obj.type in {'MESH', 'CURVE', 'SURFACE', 'FONT', 'META'}:
-                if hasattr(obj, 'material_slots') and obj.material_slots:
-                    for material_slot in obj.material_slots:
-                        material = material_slot.material
-                        if material is not None and material.use_nodes:
-                            for node in material.node_tree.nodes:
-                                if node.type == 'TEX_IMAGE':
-                                    image = node.image
-                                    if image is not None and image.name and image.has_data:
-                                        images_to_export.add(image)
+        images_to_export = {
+            image for image in node_graph.collect_images(all_objects) if image.has_data
+        }
         
         return len(images_to_export)
 
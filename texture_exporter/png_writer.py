@@ -0,0 +1,117 @@
+"""
+PNG 编码
+
+直接把 8 位像素编码成 PNG，可选择 L / LA / RGB / RGBA 颜色类型，
+让灰度遮罩、不透明贴图只写出真正需要的通道。
+行过滤器按行向量化地从 None/Sub/Up/Paeth 中选择。
+"""
+
+import struct
+import zlib
+import numpy as np
+
+COLOR_TYPE_L = 0
+COLOR_TYPE_RGB = 2
+COLOR_TYPE_LA = 4
+COLOR_TYPE_RGBA = 6
+
+# 颜色类型 -> 从 RGBA 中取出的通道
+_COLOR_TYPE_CHANNELS = {
+    COLOR_TYPE_L: [0],
+    COLOR_TYPE_RGB: [0, 1, 2],
+    COLOR_TYPE_LA: [0, 3],
+    COLOR_TYPE_RGBA: [0, 1, 2, 3],
+}
+
+COLOR_TYPE_NAMES = {
+    COLOR_TYPE_L: "L",
+    COLOR_TYPE_RGB: "RGB",
+    COLOR_TYPE_LA: "LA",
+    COLOR_TYPE_RGBA: "RGBA",
+}
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# 每批过滤的行数
+_ROWS_PER_BATCH = 256
+
+
+def select_color_type(info):
+    """根据通道分析结果选择最小的颜色类型"""
+    if info.grayscale:
+        return COLOR_TYPE_L if info.opaque else COLOR_TYPE_LA
+    return COLOR_TYPE_RGB if info.opaque else COLOR_TYPE_RGBA
+
+
+def _chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+
+def _filter_rows(raw, previous, bpp):
+    """对 (h, row_bytes) 的 uint8 数据逐行选择过滤器，返回带过滤类型字节的扫描线
+
+    previous 为这批行之前的一行（第一批为全零行）。
+    """
+    raw = raw.astype(np.int16)
+    above = np.concatenate([previous[None].astype(np.int16), raw[:-1]])
+    left = np.zeros_like(raw)
+    left[:, bpp:] = raw[:, :-bpp]
+    up = above
+    up_left = np.zeros_like(raw)
+    up_left[:, bpp:] = above[:, :-bpp]
+
+    # Paeth 预测只依赖未过滤的相邻字节，可以整批一起计算
+    estimate = left + up - up_left
+    dist_left = np.abs(estimate - left)
+    dist_up = np.abs(estimate - up)
+    dist_up_left = np.abs(estimate - up_left)
+    paeth = np.where(
+        (dist_left <= dist_up) & (dist_left <= dist_up_left),
+        left,
+        np.where(dist_up <= dist_up_left, up, up_left),
+    )
+
+    candidates = np.stack([
+        raw,
+        raw - left,
+        raw - up,
+        raw - (left + up) // 2,
+        raw - paeth,
+    ]).astype(np.uint8)
+
+    # 常用启发式：选择有符号绝对值之和最小的过滤器
+    scores = np.abs(candidates.view(np.int8).astype(np.int32)).sum(axis=2)
+    choice = scores.argmin(axis=0)
+    rows = np.arange(raw.shape[0])
+
+    filtered = np.empty((raw.shape[0], raw.shape[1] + 1), dtype=np.uint8)
+    filtered[:, 0] = choice
+    filtered[:, 1:] = candidates[choice, rows]
+    return filtered
+
+
+def encode_png(pixels, color_type=COLOR_TYPE_RGBA, compression=6):
+    """把自上而下的 (h, w, 4) uint8 像素编码为 PNG 字节串"""
+    height, width = pixels.shape[:2]
+    channels = _COLOR_TYPE_CHANNELS[color_type]
+    data = np.ascontiguousarray(pixels[..., channels], dtype=np.uint8)
+
+    rows = data.reshape(height, width * len(channels))
+
+    # 分批过滤并流式压缩，避免大图时候选过滤结果占用过多内存
+    compressor = zlib.compressobj(compression)
+    idat = []
+    previous = np.zeros(rows.shape[1], dtype=np.uint8)
+    for start in range(0, height, _ROWS_PER_BATCH):
+        batch = rows[start:start + _ROWS_PER_BATCH]
+        idat.append(compressor.compress(_filter_rows(batch, previous, len(channels)).tobytes()))
+        previous = batch[-1]
+    idat.append(compressor.flush())
+
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return b"".join([
+        _PNG_SIGNATURE,
+        _chunk(b"IHDR", header),
+        _chunk(b"IDAT", b"".join(idat)),
+        _chunk(b"IEND", b""),
+    ])
@@ -1,6 +1,11 @@
 import bpy
-from bpy.props import StringProperty, CollectionProperty
+from bpy.props import StringProperty, CollectionProperty, EnumProperty, BoolProperty, IntProperty
 from bpy.types import AddonPreferences, PropertyGroup
+from . import containers
+
+
+def _block_compressor_items(self, context):
+    return containers.block_compressor_items()
 
 class ExportHistoryItem(PropertyGroup):
     """导出历史记录项"""
@@ -36,6 +41,134 @@ class TextureExporterPreferences(AddonPreferences):
         min=1,
         max=50
     )
+
+    # 导出格式
+    export_format: EnumProperty(
+        name="Export Format",
+        description="Output file format",
+        items=[
+            ('PNG', "PNG", "PNG image, Unity generates mipmaps on import"),
+            ('DDS', "DDS", "DDS container with a precomputed mip chain"),
+            ('KTX2', "KTX2", "KTX2 container with a precomputed mip chain"),
+        ],
+        default='PNG'
+    )
+
+    # 容器像素格式
+    pixel_format: EnumProperty(
+        name="Pixel Format",
+        description="Pixel format of DDS/KTX2 output",
+        items=[
+            ('RGBA8', "RGBA8", "8-bit unsigned normalized"),
+            ('RGBA16F', "RGBA16F", "16-bit half float"),
+        ],
+        default='RGBA8'
+    )
+
+    # mip 滤波
+    mip_filter: EnumProperty(
+        name="Mip Filter",
+        description="Filter used to generate the mip chain",
+        items=[
+            ('BOX', "Box", "2x2 box filter, fast"),
+            ('KAISER', "Kaiser", "Kaiser-windowed sinc, sharper mips"),
+        ],
+        default='BOX'
+    )
+
+    # 块压缩器
+    block_compressor: EnumProperty(
+        name="Block Compressor",
+        description="Block compressor for DDS/KTX2 output",
+        items=_block_compressor_items
+    )
+
+    # 按通道分析结果选择最小的 PNG 颜色类型
+    optimize_png_channels: BoolProperty(
+        name="Optimize PNG Channels",
+        description="Write grayscale or opaque images as L/LA/RGB PNG instead of RGBA",
+        default=True
+    )
+
+    # 纯色图像替换为 4x4 小图
+    collapse_constant_images: BoolProperty(
+        name="Collapse Constant Images",
+        description="Replace single-color images with a 4x4 file and note them in the export manifest",
+        default=False
+    )
+
+    # 导出前烘焙程序化材质
+    bake_procedural: BoolProperty(
+        name="Bake Procedural Materials",
+        description="Bake base color, roughness and normal of materials without image textures using CPU Cycles",
+        default=False
+    )
+
+    bake_resolution: EnumProperty(
+        name="Bake Resolution",
+        description="Resolution of baked textures",
+        items=[
+            ('512', "512", ""),
+            ('1024', "1024", ""),
+            ('2048', "2048", ""),
+            ('4096', "4096", ""),
+        ],
+        default='1024'
+    )
+
+    # 烘焙缓存目录，留空使用 Blender 用户数据目录
+    bake_cache_directory: StringProperty(
+        name="Bake Cache Directory",
+        description="Directory for cached bake results, empty to use the Blender user data directory",
+        default="",
+        subtype='DIR_PATH'
+    )
+    
+    # 按 UV 覆盖范围裁剪
+    crop_to_uv: BoolProperty(
+        name="Crop to UV Coverage",
+        description="Export only the region of each image used by the objects' UVs and write the UV remap to the export manifest",
+        default=False
+    )
+
+    crop_padding: IntProperty(
+        name="Crop Padding",
+        description="Pixels kept around the used UV region",
+        default=8,
+        min=0
+    )
+
+    # 编码结果缓存
+    use_encoded_cache: BoolProperty(
+        name="Use Encoded Texture Cache",
+        description="Reuse encoded files across export directories instead of re-encoding",
+        default=True
+    )
+
+    # 编码缓存目录，留空使用 Blender 用户数据目录
+    encoded_cache_directory: StringProperty(
+        name="Encoded Cache Directory",
+        description="Directory for cached encoded textures, empty to use the Blender user data directory",
+        default="",
+        subtype='DIR_PATH'
+    )
+
+    encoded_cache_size_mb: IntProperty(
+        name="Cache Size Limit (MB)",
+        description="Least recently used entries are evicted above this size",
+        default=2048,
+        min=64
+    )
+
+    encoded_cache_link_mode: EnumProperty(
+        name="Materialize",
+        description="How cached files are placed into the export directory",
+        items=[
+            ('COPY', "Copy", "Always copy cached files"),
+            ('HARDLINK', "Hardlink", "Hardlink cached files, falls back to copying across file systems. Edit exported files by replacing them, not in place"),
+        ],
+        default='COPY'
+    )
     
     def draw(self, context):
         layout = self.layout
@@ -45,6 +178,35 @@ class TextureExporterPreferences(AddonPreferences):
         
         # 最大历史记录数量
         layout.prop(self, "max_history_items")
+
+        # 导出格式设置
+        box = layout.box()
+        box.prop(self, "export_format")
+        if self.export_format == 'PNG':
+            box.prop(self, "optimize_png_channels")
+        box.prop(self, "collapse_constant_images")
+        box.prop(self, "crop_to_uv")
+        if self.crop_to_uv:
+            box.prop(self, "crop_padding")
+        if self.export_format != 'PNG':
+            box.prop(self, "pixel_format")
+            box.prop(self, "mip_filter")
+            box.prop(self, "block_compressor")
+
+        # 烘焙设置
+        box = layout.box()
+        box.prop(self, "bake_procedural")
+        if self.bake_procedural:
+            box.prop(self, "bake_resolution")
+            box.prop(self, "bake_cache_directory")
+
+        # 编码缓存设置
+        box = layout.box()
+        box.prop(self, "use_encoded_cache")
+        if self.use_encoded_cache:
+            box.prop(self, "encoded_cache_directory")
+            box.prop(self, "encoded_cache_size_mb")
+            box.prop(self, "encoded_cache_link_mode")
         
         # 历史记录列表
         if self.export_history:
@@ -0,0 +1,154 @@
+"""
+编码结果缓存
+
+按像素内容哈希加编码设置对编码后的文件做内容寻址缓存，导出到多个目录时
+直接复制（或硬链接）缓存文件，不再重复编码。
+
+缓存文件先写入临时文件再原子重命名，删除和链接都容忍条目被其他进程同时淘汰，
+同一台机器上的多个 Blender 实例可以共享同一个缓存目录。
+元数据中记录数据文件的大小和哈希，取出时校验，损坏的条目直接丢弃；
+硬链接模式下就地修改导出文件会改到缓存条目，下次取出时由校验发现。
+按元数据文件的修改时间做 LRU 淘汰，命中时只刷新元数据文件，导出文件的修改时间保持不变。
+"""
+
+import bpy
+import os
+import json
+import uuid
+import hashlib
+import threading
+
+LINK_MODES = ('HARDLINK', 'COPY')
+
+
+def default_cache_directory():
+    return bpy.utils.user_resource('DATAFILES', path=os.path.join("texture_exporter", "encoded_cache"), create=True)
+
+
+def _temp_name(path):
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.{uuid.uuid4().hex[:8]}.tmp"
+
+
+def _data_digest(data):
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def _remove_entry_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _write_atomic(path, data):
+    temp_path = _temp_name(path)
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class TextureCache:
+    """内容寻址的编码结果缓存"""
+
+    def __init__(self, directory, max_bytes, link_mode='COPY'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.link_mode = link_mode
+        self._objects = os.path.join(directory, "objects")
+        os.makedirs(self._objects, exist_ok=True)
+
+    @staticmethod
+    def key(pixels, settings):
+        """像素内容和编码设置的哈希"""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(repr(settings).encode("utf-8"))
+        digest.update(repr(pixels.shape).encode("utf-8"))
+        digest.update(pixels.tobytes())
+        return digest.hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self._objects, key[:2], key)
+        return base + ".bin", base + ".json"
+
+    def fetch(self, key):
+        """命中时返回 (元数据, 数据)，未命中或条目损坏时返回 None"""
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+            with open(data_path, "rb") as f:
+                data = f.read()
+        except (OSError, ValueError):
+            # 条目不存在、不完整或刚被其他进程淘汰
+            return None
+
+        if len(data) != metadata.get("size") or _data_digest(data) != metadata.get("blake2b"):
+            print(f"缓存条目已损坏，丢弃 {key}")
+            self._discard(key)
+            return None
+
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return metadata, data
+
+    def link(self, key, filepath):
+        """把缓存数据文件硬链接到尚不存在的 filepath，失败（跨文件系统、条目已被淘汰等）时返回 False"""
+        try:
+            os.link(self._paths(key)[0], filepath)
+        except OSError as e:
+            print(f"硬链接失败，改为复制 {filepath}: {e}")
+            return False
+        return True
+
+    def _discard(self, key):
+        # 先删数据文件，使条目立即失效
+        for path in self._paths(key):
+            try:
+                _remove_entry_file(path)
+            except OSError:
+                pass
+
+    def store(self, key, data, metadata=None):
+        """写入缓存条目；元数据先写，数据文件存在即表示条目完整"""
+        data_path, meta_path = self._paths(key)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        metadata = dict(metadata or {}, size=len(data), blake2b=_data_digest(data))
+        _write_atomic(meta_path, json.dumps(metadata).encode("utf-8"))
+        _write_atomic(data_path, data)
+
+    def evict(self):
+        """按最近使用时间淘汰条目，直到总大小不超过上限"""
+        entries = []
+        total = 0
+        for shard in os.scandir(self._objects):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.name.endswith(".bin"):
+                    continue
+                try:
+                    size = entry.stat().st_size
+                except FileNotFoundError:
+                    continue
+                # 最近使用时间记录在元数据文件上
+                key = entry.name[:-len(".bin")]
+                try:
+                    used = os.stat(self._paths(key)[1]).st_mtime
+                except FileNotFoundError:
+                    used = 0.0
+                entries.append((used, size, key))
+                total += size
+
+        entries.sort()
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            self._discard(key)
+            total -= size
@@ -0,0 +1,163 @@
+"""
+按 UV 覆盖范围裁剪纹理
+
+批量读取使用某张图像的所有网格的 UV（foreach_get 到 NumPy；读取求值后的网格，
+包含镜像、阵列、UV 投影等修改器的结果），求出每张图像被实际使用的 UV 包围盒并加上边距，只导出该区域，
+同时在导出清单中给出 Unity 材质需要的 tiling / offset。
+只有 Vector 未连接或直接连接 UV Map 节点的图像纹理节点参与统计；
+坐标经过 Mapping、投影或节点组变换的图像，以及 UV 超出 [0, 1] 的平铺纹理不裁剪。
+"""
+
+import math
+import numpy as np
+
+# UV 超出 [0, 1] 的容差
+UV_EPSILON = 1e-4
+
+
+def _uv_layer(mesh, uv_map):
+    """"" 为渲染激活的 UV 层（图像纹理节点的默认坐标），否则按名称查找"""
+    if uv_map:
+        return mesh.uv_layers.get(uv_map)
+    for layer in mesh.uv_layers:
+        if layer.active_render:
+            return layer
+    return mesh.uv_layers.active
+
+
+def _loop_material_indices(mesh, slot_count):
+    """每个面拐的材质槽索引"""
+    polygon_count = len(mesh.polygons)
+    material_index = np.empty(polygon_count, dtype=np.int32)
+    loop_start = np.empty(polygon_count, dtype=np.int32)
+    loop_total = np.empty(polygon_count, dtype=np.int32)
+    mesh.polygons.foreach_get("material_index", material_index)
+    mesh.polygons.foreach_get("loop_start", loop_start)
+    mesh.polygons.foreach_get("loop_total", loop_total)
+
+    # 超出材质槽数量的索引按 Blender 的行为使用最后一个槽
+    np.minimum(material_index, slot_count - 1, out=material_index)
+    order = np.argsort(loop_start, kind="stable")
+    return np.repeat(material_index[order], loop_total[order])
+
+
+def image_uv_bounds(objects, walker, depsgraph):
+    """统计每张图像被使用的 UV 包围盒
+
+    返回 图像 -> (umin, vmin, umax, vmax)，无法确定覆盖范围的图像值为 None：
+    采样坐标经过变换的图像、非网格对象使用的图像，以及引用的 UV 层不存在的图像。
+    """
+    bounds = {}
+
+    def merge(image, lower, upper):
+        if image in bounds and bounds[image] is None:
+            return
+        if image in bounds:
+            old = bounds[image]
+            lower = np.minimum(lower, old[:2])
+            upper = np.maximum(upper, old[2:])
+        bounds[image] = (float(lower[0]), float(lower[1]), float(upper[0]), float(upper[1]))
+
+    for obj in objects:
+        slots = getattr(obj, 'material_slots', None)
+        if not slots:
+            continue
+        slot_uses = [
+            walker.material_image_uv_maps(slot.material) if slot.material is not None else {}
+            for slot in slots
+        ]
+        if not any(slot_uses):
+            continue
+
+        if obj.type != 'MESH':
+            # 非网格对象无法确定覆盖范围
+            for uses in slot_uses:
+                for image in uses:
+                    bounds[image] = None
+            continue
+
+        # 修改器会改变实际渲染使用的 UV，读取求值后的网格
+        evaluated = obj.evaluated_get(depsgraph)
+        mesh = evaluated.to_mesh()
+        try:
+            loop_materials = _loop_material_indices(mesh, len(slots))
+            uv_cache = {}
+
+            for index, uses in enumerate(slot_uses):
+                used_loops = None
+                for image, uv_maps in uses.items():
+                    for uv_map in uv_maps:
+                        layer = _uv_layer(mesh, uv_map) if uv_map is not None else None
+                        if layer is None:
+                            # 坐标经过变换，或引用的 UV 层不存在
+                            bounds[image] = None
+                            continue
+
+                        if used_loops is None:
+                            used_loops = loop_materials == index
+                        if not used_loops.any():
+                            continue
+                        if layer.name not in uv_cache:
+                            uvs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+                            layer.data.foreach_get("uv", uvs)
+                            uv_cache[layer.name] = uvs.reshape(-1, 2)
+                        used = uv_cache[layer.name][used_loops]
+                        merge(image, used.min(axis=0), used.max(axis=0))
+        finally:
+            evaluated.to_mesh_clear()
+
+    return bounds
+
+
+def pixel_region(uv_bounds, size, padding):
+    """把 UV 包围盒换算成像素区域 (x0, y0, x1, y1)，y 自下而上
+
+    平铺（UV 超出 [0, 1]）或覆盖整张图像时返回 None。
+    """
+    umin, vmin, umax, vmax = uv_bounds
+    if umin < -UV_EPSILON or vmin < -UV_EPSILON or umax > 1 + UV_EPSILON or vmax > 1 + UV_EPSILON:
+        return None
+
+    width, height = size
+    x0 = max(0, math.floor(umin * width) - padding)
+    y0 = max(0, math.floor(vmin * height) - padding)
+    x1 = min(width, math.ceil(umax * width) + padding)
+    y1 = min(height, math.ceil(vmax * height) + padding)
+    if x1 <= x0 or y1 <= y0 or (x0, y0, x1, y1) == (0, 0, width, height):
+        return None
+    return x0, y0, x1, y1
+
+
+def compute_crop_regions(objects, walker, padding, depsgraph):
+    """返回 图像 -> 裁剪区域，只包含确实可以裁剪的图像"""
+    regions = {}
+    for image, uv_bounds in image_uv_bounds(objects, walker, depsgraph).items():
+        if uv_bounds is None or not image.has_data:
+            continue
+        region = pixel_region(uv_bounds, tuple(image.size), padding)
+        if region is not None:
+            regions[image] = region
+    return regions
+
+
+def crop_pixels(pixels, region):
+    """从自上而下的 (h, w, 4) 像素中取出区域"""
+    height = pixels.shape[0]
+    x0, y0, x1, y1 = region
+    return pixels[height - y1:height - y0, x0:x1]
+
+
+def crop_note(region, size):
+    """导出清单条目：原 UV 经 uv * uv_scale + uv_offset 映射到裁剪后的纹理（与 Unity 材质 tiling/offset 一致）"""
+    width, height = size
+    x0, y0, x1, y1 = region
+    crop_width = x1 - x0
+    crop_height = y1 - y0
+    return {
+        "crop": {
+            "region": [x0, y0, x1, y1],
+            "original_size": [width, height],
+            "uv_scale": [width / crop_width, height / crop_height],
+            "uv_offset": [-x0 / crop_width, -y0 / crop_height],
+        }
+    }
@@ -0,0 +1,111 @@
+"""
+后台写出
+
+编码好的数据放入有界队列，由单独的写线程写到目标目录中的临时文件，
+导出结束时统一 fsync，再原子重命名为最终文件名并 fsync 目录。
+编码与磁盘 I/O 因此可以重叠，Unity 也不会读到写了一半的文件。
+"""
+
+import os
+import queue
+import threading
+import uuid
+
+
+def temp_path_for(filepath):
+    """与目标文件同目录的临时文件名；以点开头，Unity 会忽略这类文件"""
+    directory, filename = os.path.split(filepath)
+    return os.path.join(directory, f".{filename}.{uuid.uuid4().hex[:8]}.tmp")
+
+
+def _fsync_file(path):
+    """fsync 需要可写句柄（Windows 上只读句柄会失败）"""
+    fd = os.open(path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class WriteBehindWriter:
+    """有界队列 + 写线程，close() 时批量 fsync 并原子重命名"""
+
+    def __init__(self, max_pending=8):
+        self._queue = queue.Queue(maxsize=max_pending)
+        # (临时文件, 目标文件, 是否需要 fsync)
+        self._written = []
+        # (目标文件, 异常)
+        self._failed = []
+        self._thread = threading.Thread(target=self._run, name="texture_exporter_writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, filepath, data):
+        """排队写出数据，队列满时阻塞"""
+        self._queue.put((filepath, data, None, True))
+
+    def submit_file(self, temp_path, filepath, sync=True):
+        """排队一个已经写好的临时文件，与其他文件一起 fsync 并重命名
+
+        sync 为 False 时跳过 fsync，用于数据已经落盘的硬链接。
+        """
+        self._queue.put((filepath, None, temp_path, sync))
+
+    def close(self):
+        """等待写线程完成，返回失败的 [(目标文件, 异常), ...]"""
+        self._queue.put(None)
+        self._thread.join()
+        return self._failed
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            filepath, data, temp_path, sync = item
+            if temp_path is None:
+                temp_path = temp_path_for(filepath)
+                try:
+                    with open(temp_path, "wb") as f:
+                        f.write(data)
+                except Exception as e:
+                    print(f"写入失败 {filepath}: {e}")
+                    self._failed.append((filepath, e))
+                    _remove_quietly(temp_path)
+                    continue
+            self._written.append((temp_path, filepath, sync))
+        self._commit()
+
+    def _commit(self):
+        """一次导出结束时统一 fsync，再重命名并同步目录"""
+        directories = set()
+        for temp_path, filepath, sync in self._written:
+            try:
+                if sync:
+                    _fsync_file(temp_path)
+                os.replace(temp_path, filepath)
+                directories.add(os.path.dirname(filepath))
+            except Exception as e:
+                print(f"写入失败 {filepath}: {e}")
+                self._failed.append((filepath, e))
+                _remove_quietly(temp_path)
+        self._written = []
+
+        # Windows 无法打开目录做 fsync
+        if os.name == 'nt':
+            return
+        for directory in directories:
+            try:
+                fd = os.open(directory or ".", os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass